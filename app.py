@@ -1,5 +1,12 @@
+import pandas as pd
 import streamlit as st
 
+from pricing import (
+    MAX_EXTRA_QTY, MAX_YEN, apply_discount, discount_is_nan, parse_price,
+    price_extras, price_out_of_range,
+)
+from styles import CUSTOM_CSS
+
 # ---------- PAGE CONFIG ----------
 st.set_page_config(
     page_title="High-End Japanese Hotel - Pricing Calculator",
@@ -8,222 +15,181 @@ st.set_page_config(
 )
 
 # ---------- CUSTOM CSS (Optional) ----------
-custom_css = """
-<style>
-body {
-    background: url("https://images.unsplash.com/photo-1586500051230-836e79a2b353?ixlib=rb-4.0.3&auto=format&fit=crop&w=2067&q=80");
-    background-size: cover;
-    background-position: center;
-    color: #fff;
-    font-family: 'Noto Sans JP', sans-serif;
-}
-
-[data-testid="stAppViewContainer"] {
-    background-color: rgba(0,0,0,0.4) !important;
-    padding: 2rem;
-    border-radius: 1rem;
-}
-
-h1, h2, h3, h4 {
-    font-family: 'Noto Serif JP', serif;
-    font-weight: 500;
-    color: #fffae6;
-    text-shadow: 1px 1px 2px #000;
-}
-
-label {
-    font-size: 1.1rem;
-    color: #fffae6;
-}
-
-.stButton button {
-    background-color: #6B2E5F !important;
-    border: none;
-    color: #ffffff;
-    padding: 0.6rem 1.2rem;
-    font-size: 1rem;
-    border-radius: 8px;
-    cursor: pointer;
-}
-.stButton button:hover {
-    background-color: #8f437c !important;
-}
-</style>
-"""
-st.markdown(custom_css, unsafe_allow_html=True)
+# Re-emitted on every run: Streamlit drops any element a rerun does not
+# draw again, so injecting this only once per session would lose the styling.
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 # ---------- HELPER FUNCTIONS ----------
-def parse_price(input_str):
-    """
-    Convert a free-text yen input (e.g., '¥30,000' or '30000') to a float.
-    Returns 0.0 if parsing fails.
+def extras_table(rows, subtotal):
     """
-    cleaned = input_str.replace("¥", "").replace(",", "").strip()
-    try:
-        return float(cleaned)
-    except ValueError:
-        return 0.0
-
-def parse_discount(input_str):
-    """
-    Parse a discount input (e.g., '10%' or '¥2000').
-    Returns (is_percent, value).
-      - is_percent = True if it's a '%' discount.
-      - value = numeric discount amount (float).
+    Build the breakdown table for priced ExtraRow lines,
+    one row per item plus a closing subtotal row.
     """
-    inp = input_str.strip()
-    if inp.endswith("%"):
-        # Percentage discount
-        try:
-            val = float(inp[:-1])  # remove '%' and convert
-            return (True, val)
-        except ValueError:
-            return (False, 0.0)
-    else:
-        # Assume currency discount
-        cleaned = inp.replace("¥", "").replace(",", "").strip()
-        try:
-            val = float(cleaned)
-            return (False, val)
-        except ValueError:
-            return (False, 0.0)
-
-def apply_discount(base_price, discount_str):
+    table = [
+        {
+            "項目": row.name,
+            "単価": f"¥{row.cost_val:,}",
+            "割引": row.discount_str if row.discount_str != "0" else "",
+            "割引後": f"¥{row.discounted_cost:,}",
+            "数量": str(row.qty),
+            "小計": f"¥{row.line_total:,}",
+        }
+        for row in rows
+    ]
+    table.append({"項目": "追加料金小計", "単価": "", "割引": "", "割引後": "",
+                  "数量": "", "小計": f"¥{subtotal:,}"})
+    return pd.DataFrame(table).set_index("項目")
+
+
+def extras_editor(prefix, discount_label):
     """
-    Applies discount to base_price based on discount_str.
-    If discount is percentage, base_price * (1 - discount%).
-    If discount is absolute yen, base_price - discount.
-    Returns final price (>= 0).
+    Render an editable table of additional charges and return its rows
+    as item dicts with "name", "cost_str", "qty" and "discount_str".
+    A single st.data_editor replaces the four widgets per row.
     """
-    (is_percent, val) = parse_discount(discount_str)
-    if is_percent:
-        discounted_price = base_price - (base_price * (val / 100.0))
-    else:
-        discounted_price = base_price - val
+    df_key = f"{prefix}_extras_df"
+    if df_key not in st.session_state:
+        st.session_state[df_key] = pd.DataFrame({
+            "name": pd.Series(dtype="string"),
+            "cost": pd.Series(dtype="string"),
+            "qty": pd.Series(dtype="int64"),
+            "discount": pd.Series(dtype="string"),
+        })
 
-    return max(discounted_price, 0)
+    edited = st.data_editor(
+        st.session_state[df_key],
+        num_rows="dynamic",
+        hide_index=True,
+        column_config={
+            "name": st.column_config.TextColumn("項目名", default=""),
+            "cost": st.column_config.TextColumn("料金 (円)", default="0"),
+            "qty": st.column_config.NumberColumn("数量", min_value=0, max_value=MAX_EXTRA_QTY,
+                                                 step=1, default=1),
+            "discount": st.column_config.TextColumn(discount_label, default="0"),
+        },
+        key=f"{prefix}_extras_editor",
+    )
+    # Cells the user cleared come back as missing values
+    edited = edited.fillna({"name": "", "cost": "0", "qty": 0, "discount": "0"})
+
+    return [
+        {
+            "name": row.name,
+            "cost_str": row.cost,
+            "qty": min(int(row.qty), MAX_EXTRA_QTY),
+            "discount_str": row.discount
+        }
+        for row in edited.itertuples(index=False)
+    ]
 
 
 # ---------- TITLE ----------
 st.title("和楽 料金計算システム")
 st.markdown("**すべて税込でご入力ください。** 大人・子供の人数と、それぞれが希望する食事オプション・追加料金を入力します。")
 
-# ====================
-# 1) ROOM PRICING
-# ====================
-# ---------- ADULT INPUTS ----------
-st.subheader("1. 大人料金")
-col1, col2 = st.columns(2)
-with col1:
-    adult_base_str = st.text_input("大人1名あたりの基本料金 (税込)", value="0")
-with col2:
-    adult_discount_str = st.text_input("大人向け割引 (例: '10%' or '¥2000')", value="0")
-
-num_adults = st.number_input("大人の人数", min_value=0, value=0)
-
-# ---------- CHILD INPUTS ----------
-st.subheader("2. 子供料金")
-col3, col4 = st.columns(2)
-with col3:
-    child_base_str = st.text_input("子供1名あたりの基本料金 (税込)", value="0")
-with col4:
-    child_discount_str = st.text_input("子供向け割引 (例: '5%' or '¥1000')", value="0")
-
-num_children = st.number_input("子供の人数", min_value=0, value=0)
-
-# ====================
-# 2) MEALS
-# ====================
-# ---------- MEALS: ADULTS ----------
-st.subheader("3. 食事オプション（大人）")
-with st.expander("大人用の食事詳細を入力する"):
-    colA1, colA2 = st.columns(2)
-    with colA1:
-        adult_breakfast_str = st.text_input("朝食料金（大人1名あたり・税込）", value="0")
-        adults_breakfast_count = st.number_input("朝食を希望する大人の人数", min_value=0, value=0)
-    with colA2:
-        adult_dinner_str = st.text_input("夕食料金（大人1名あたり・税込）", value="0")
-        adults_dinner_count = st.number_input("夕食を希望する大人の人数", min_value=0, value=0)
-
-# ---------- MEALS: CHILDREN ----------
-st.subheader("4. 食事オプション（子供）")
-with st.expander("子供用の食事詳細を入力する"):
-    colC1, colC2 = st.columns(2)
-    with colC1:
-        child_breakfast_str = st.text_input("朝食料金（子供1名あたり・税込）", value="0")
-        children_breakfast_count = st.number_input("朝食を希望する子供の人数", min_value=0, value=0)
-    with colC2:
-        child_dinner_str = st.text_input("夕食料金（子供1名あたり・税込）", value="0")
-        children_dinner_count = st.number_input("夕食を希望する子供の人数", min_value=0, value=0)
-
-
-# ====================
-# 3) ADDITIONAL CHARGES
-# ====================
-st.subheader("5. 追加料金 (Extra Charges)")
-
-# ---------- ADULT ADDITIONAL CHARGES ----------
-with st.expander("大人向けの追加料金"):
-    st.markdown("下記に大人用の追加料金を入力してください。**割引を含む場合は% または ¥ で入力**。")
-
-    adult_extra_count = st.number_input("大人向け追加項目の数", min_value=0, value=0, step=1)
-
-    adult_extra_items = []
-    for i in range(adult_extra_count):
-        st.write(f"**追加項目 #{i+1} (大人)**")
-        col_ex1, col_ex2, col_ex3, col_ex4 = st.columns([2,1,1,1])
-        with col_ex1:
-            extra_name = st.text_input(f"項目名", value="", key=f"adult_extra_name_{i}")
-        with col_ex2:
-            extra_cost_str = st.text_input(f"料金 (円)", value="0", key=f"adult_extra_cost_{i}")
-        with col_ex3:
-            extra_qty = st.number_input(f"数量", min_value=0, value=1, key=f"adult_extra_qty_{i}")
-        with col_ex4:
-            extra_discount_str = st.text_input("割引 (例: '10%' or '¥500')", value="0", 
-                                               key=f"adult_extra_discount_{i}")
-        
-        adult_extra_items.append({
-            "name": extra_name,
-            "cost_str": extra_cost_str,
-            "qty": extra_qty,
-            "discount_str": extra_discount_str
-        })
-
-# ---------- CHILD ADDITIONAL CHARGES ----------
-with st.expander("子供向けの追加料金"):
-    st.markdown("下記に子供用の追加料金を入力してください。**割引を含む場合は% または ¥ で入力**。")
-
-    child_extra_count = st.number_input("子供向け追加項目の数", min_value=0, value=0, step=1)
-
-    child_extra_items = []
-    for i in range(child_extra_count):
-        st.write(f"**追加項目 #{i+1} (子供)**")
-        col_ex1, col_ex2, col_ex3, col_ex4 = st.columns([2,1,1,1])
-        with col_ex1:
-            extra_name = st.text_input(f"項目名", value="", key=f"child_extra_name_{i}")
-        with col_ex2:
-            extra_cost_str = st.text_input(f"料金 (円)", value="0", key=f"child_extra_cost_{i}")
-        with col_ex3:
-            extra_qty = st.number_input(f"数量", min_value=0, value=1, key=f"child_extra_qty_{i}")
-        with col_ex4:
-            extra_discount_str = st.text_input("割引 (例: '10%' or '¥300')", value="0", 
-                                               key=f"child_extra_discount_{i}")
-        
-        child_extra_items.append({
-            "name": extra_name,
-            "cost_str": extra_cost_str,
-            "qty": extra_qty,
-            "discount_str": extra_discount_str
-        })
+# All pricing inputs are batched in one form so the script only reruns on submit.
+with st.form("pricing_form"):
+    # ====================
+    # 1) ROOM PRICING
+    # ====================
+    # ---------- ADULT INPUTS ----------
+    st.subheader("1. 大人料金")
+    col1, col2 = st.columns(2)
+    with col1:
+        adult_base_str = st.text_input("大人1名あたりの基本料金 (税込)", value="0")
+    with col2:
+        adult_discount_str = st.text_input("大人向け割引 (例: '10%' or '¥2000')", value="0")
+
+    num_adults = st.number_input("大人の人数", min_value=0, value=0)
+
+    # ---------- CHILD INPUTS ----------
+    st.subheader("2. 子供料金")
+    col3, col4 = st.columns(2)
+    with col3:
+        child_base_str = st.text_input("子供1名あたりの基本料金 (税込)", value="0")
+    with col4:
+        child_discount_str = st.text_input("子供向け割引 (例: '5%' or '¥1000')", value="0")
+
+    num_children = st.number_input("子供の人数", min_value=0, value=0)
+
+    # ====================
+    # 2) MEALS
+    # ====================
+    # ---------- MEALS: ADULTS ----------
+    st.subheader("3. 食事オプション（大人）")
+    with st.expander("大人用の食事詳細を入力する"):
+        colA1, colA2 = st.columns(2)
+        with colA1:
+            adult_breakfast_str = st.text_input("朝食料金（大人1名あたり・税込）", value="0")
+            adults_breakfast_count = st.number_input("朝食を希望する大人の人数", min_value=0, value=0)
+        with colA2:
+            adult_dinner_str = st.text_input("夕食料金（大人1名あたり・税込）", value="0")
+            adults_dinner_count = st.number_input("夕食を希望する大人の人数", min_value=0, value=0)
+
+    # ---------- MEALS: CHILDREN ----------
+    st.subheader("4. 食事オプション（子供）")
+    with st.expander("子供用の食事詳細を入力する"):
+        colC1, colC2 = st.columns(2)
+        with colC1:
+            child_breakfast_str = st.text_input("朝食料金（子供1名あたり・税込）", value="0")
+            children_breakfast_count = st.number_input("朝食を希望する子供の人数", min_value=0, value=0)
+        with colC2:
+            child_dinner_str = st.text_input("夕食料金（子供1名あたり・税込）", value="0")
+            children_dinner_count = st.number_input("夕食を希望する子供の人数", min_value=0, value=0)
+
+
+    # ====================
+    # 3) ADDITIONAL CHARGES
+    # ====================
+    st.subheader("5. 追加料金 (Extra Charges)")
+
+    # ---------- ADULT ADDITIONAL CHARGES ----------
+    with st.expander("大人向けの追加料金"):
+        st.markdown("下記に大人用の追加料金を入力してください。**割引を含む場合は% または ¥ で入力**。")
+        adult_extra_items = extras_editor("adult", "割引 (例: '10%' or '¥500')")
+
+    # ---------- CHILD ADDITIONAL CHARGES ----------
+    with st.expander("子供向けの追加料金"):
+        st.markdown("下記に子供用の追加料金を入力してください。**割引を含む場合は% または ¥ で入力**。")
+        child_extra_items = extras_editor("child", "割引 (例: '10%' or '¥300')")
+
+    submitted = st.form_submit_button("料金を計算する")
 
 
 # ====================
 # CALCULATION
 # ====================
-btn_calculate = st.button("料金を計算する")
-if btn_calculate:
+if submitted:
+    # Nothing entered yet: skip parsing and the summary entirely
+    if num_adults == 0 and num_children == 0 and not any((
+        adults_breakfast_count, adults_dinner_count,
+        children_breakfast_count, children_dinner_count,
+        adult_extra_items, child_extra_items,
+    )):
+        st.info("入力が空です")
+        st.stop()
+
+    # A NaN discount cannot be clamped to anything meaningful; reject it
+    discount_inputs = [adult_discount_str, child_discount_str]
+    discount_inputs += [item["discount_str"] for item in adult_extra_items + child_extra_items]
+    nan_discounts = [text for text in discount_inputs if discount_is_nan(text)]
+    if nan_discounts:
+        st.error("割引に数値ではない値は使用できません: " + "、".join(nan_discounts))
+        st.stop()
+
+    # Amounts beyond the cap are clamped by parse_price; say so, since a
+    # stray extra digit should not go unnoticed.
+    price_inputs = [adult_base_str, child_base_str,
+                    adult_breakfast_str, adult_dinner_str,
+                    child_breakfast_str, child_dinner_str]
+    price_inputs += [item["cost_str"] for item in adult_extra_items + child_extra_items]
+    too_large = [text for text in price_inputs if price_out_of_range(text)]
+    if too_large:
+        st.warning(f"¥{MAX_YEN:,} を超える金額は ¥{MAX_YEN:,} として計算しました: "
+                   + "、".join(too_large))
+
     # --------------------------------------------------
-    # 1) Room base & discount (EXISTING LOGIC - UNCHANGED)
+    # 1) Room base & discount (whole yen, floored per guest)
     # --------------------------------------------------
     adult_base_price = parse_price(adult_base_str)
     child_base_price = parse_price(child_base_str)
@@ -234,7 +200,7 @@ if btn_calculate:
     total_child_cost = final_child_price * num_children
 
     # --------------------------------------------------
-    # 2) Meal costs (EXISTING LOGIC - UNCHANGED)
+    # 2) Meal costs (whole yen)
     # --------------------------------------------------
     adult_breakfast_price = parse_price(adult_breakfast_str)
     adult_dinner_price = parse_price(adult_dinner_str)
@@ -249,23 +215,12 @@ if btn_calculate:
     # --------------------------------------------------
     # 3) Additional charges (ADULTS) - NOW WITH DISCOUNT
     # --------------------------------------------------
-    total_adult_extras = 0
-    for item in adult_extra_items:
-        cost_val = parse_price(item["cost_str"])
-        # Apply per-item discount
-        discounted_cost = apply_discount(cost_val, item["discount_str"])
-        line_total = discounted_cost * item["qty"]
-        total_adult_extras += line_total
+    adult_extra_rows, total_adult_extras = price_extras(adult_extra_items)
 
     # --------------------------------------------------
     # 4) Additional charges (CHILDREN) - NOW WITH DISCOUNT
     # --------------------------------------------------
-    total_child_extras = 0
-    for item in child_extra_items:
-        cost_val = parse_price(item["cost_str"])
-        discounted_cost = apply_discount(cost_val, item["discount_str"])
-        line_total = discounted_cost * item["qty"]
-        total_child_extras += line_total
+    child_extra_rows, total_child_extras = price_extras(child_extra_items)
 
     # --------------------------------------------------
     # 5) Final Summation
@@ -280,76 +235,44 @@ if btn_calculate:
     st.markdown("---")
     st.subheader("料金明細 / Summary")
 
+    # Room and meal lines are collected here and sent in one st.markdown call.
+    lines = []
+
     # Room Subtotals
     if num_adults > 0:
-        st.write(
-            f"**大人 客室小計**: ¥{int(total_adult_cost):,} "
-            f"( {int(final_adult_price):,} 円 × {num_adults}名 )"
+        lines.append(
+            f"**大人 客室小計**: ¥{total_adult_cost:,} "
+            f"( {final_adult_price:,} 円 × {num_adults}名 )"
         )
     if num_children > 0:
-        st.write(
-            f"**子供 客室小計**: ¥{int(total_child_cost):,} "
-            f"( {int(final_child_price):,} 円 × {num_children}名 )"
+        lines.append(
+            f"**子供 客室小計**: ¥{total_child_cost:,} "
+            f"( {final_child_price:,} 円 × {num_children}名 )"
         )
 
     # Meal Subtotals
-    st.write(
-        f"**大人 食事小計**: ¥{int(total_adult_meal_cost):,} "
-        f"（朝食: ¥{int(adult_breakfast_price):,} × {adults_breakfast_count}名 + "
-        f"夕食: ¥{int(adult_dinner_price):,} × {adults_dinner_count}名）"
+    lines.append(
+        f"**大人 食事小計**: ¥{total_adult_meal_cost:,} "
+        f"（朝食: ¥{adult_breakfast_price:,} × {adults_breakfast_count}名 + "
+        f"夕食: ¥{adult_dinner_price:,} × {adults_dinner_count}名）"
     )
-    st.write(
-        f"**子供 食事小計**: ¥{int(total_child_meal_cost):,} "
-        f"（朝食: ¥{int(child_breakfast_price):,} × {children_breakfast_count}名 + "
-        f"夕食: ¥{int(child_dinner_price):,} × {children_dinner_count}名）"
+    lines.append(
+        f"**子供 食事小計**: ¥{total_child_meal_cost:,} "
+        f"（朝食: ¥{child_breakfast_price:,} × {children_breakfast_count}名 + "
+        f"夕食: ¥{child_dinner_price:,} × {children_dinner_count}名）"
     )
 
+    st.markdown("\n\n".join(lines))
+
     # Additional Charges Subtotals (Adults)
-    if adult_extra_items:
+    if adult_extra_rows:
         st.markdown("**大人 追加料金:**")
-        for item in adult_extra_items:
-            cost_val = parse_price(item["cost_str"])
-            discounted_cost = apply_discount(cost_val, item["discount_str"])
-            line_total = discounted_cost * item["qty"]
-            # Show the original line with discount breakdown
-            if item["discount_str"] and item["discount_str"] != "0":
-                st.write(
-                    f"- {item['name']} : "
-                    f"**(割引前)** ¥{int(cost_val):,} → "
-                    f"**(割引後)** ¥{int(discounted_cost):,} "
-                    f"× {item['qty']}個 = ¥{int(line_total):,} "
-                    f" _(割引: {item['discount_str']})_"
-                )
-            else:
-                st.write(
-                    f"- {item['name']} : ¥{int(cost_val):,} "
-                    f"× {item['qty']} = ¥{int(line_total):,}"
-                )
-        st.write(f"**大人 追加料金小計**: ¥{int(total_adult_extras):,}")
+        st.table(extras_table(adult_extra_rows, total_adult_extras))
 
     # Additional Charges Subtotals (Children)
-    if child_extra_items:
+    if child_extra_rows:
         st.markdown("**子供 追加料金:**")
-        for item in child_extra_items:
-            cost_val = parse_price(item["cost_str"])
-            discounted_cost = apply_discount(cost_val, item["discount_str"])
-            line_total = discounted_cost * item["qty"]
-            # Show the original line with discount breakdown
-            if item["discount_str"] and item["discount_str"] != "0":
-                st.write(
-                    f"- {item['name']} : "
-                    f"**(割引前)** ¥{int(cost_val):,} → "
-                    f"**(割引後)** ¥{int(discounted_cost):,} "
-                    f"× {item['qty']}個 = ¥{int(line_total):,} "
-                    f" _(割引: {item['discount_str']})_"
-                )
-            else:
-                st.write(
-                    f"- {item['name']} : ¥{int(cost_val):,} "
-                    f"× {item['qty']} = ¥{int(line_total):,}"
-                )
-        st.write(f"**子供 追加料金小計**: ¥{int(total_child_extras):,}")
+        st.table(extras_table(child_extra_rows, total_child_extras))
 
     # Grand Total
-    st.markdown(f"## **合計金額：¥{int(grand_total):,}**")
-    st.balloons()
+    st.markdown(f"## **合計金額：¥{grand_total:,}**")
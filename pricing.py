@@ -0,0 +1,173 @@
+# ---------- PRICING HELPERS ----------
+# Imported once per process, so the lru_caches below are shared by every
+# Streamlit rerun and session instead of being rebuilt with app.py.
+import functools
+from collections import namedtuple
+from decimal import ROUND_CEILING, ROUND_HALF_EVEN, Decimal, InvalidOperation
+
+import numpy as np
+
+# Deletion table for the currency sign, thousands separators and whitespace
+# (including the full-width space), so no separate strip() pass is needed.
+_YEN_CHARS = str.maketrans("", "", "¥, \t\r\n\u3000")
+
+# Bounds on free-text input. Larger yen amounts and surcharges are clamped
+# to these limits, which together with MAX_EXTRA_QTY keeps the int64
+# columns in price_extras far from overflow.
+MAX_YEN = 10**10
+_MAX_SURCHARGE_PERCENT = 1000
+MAX_EXTRA_QTY = 9999
+
+# Percentages are carried as integer hundredths of a percent, so 100% is
+# this many units and a discounted price is base * factor // _PERCENT_SCALE.
+_PERCENT_SCALE = 10000
+
+def _to_decimal(text):
+    """
+    Parse already-cleaned text as a Decimal.
+    Returns None if it is not a number.
+    """
+    try:
+        return Decimal(text)
+    except InvalidOperation:
+        return None
+
+@functools.lru_cache(maxsize=512)
+def parse_price(input_str):
+    """
+    Convert a free-text yen input (e.g., '¥30,000' or '30000') to an int.
+    Yen have no sub-unit, so any fraction is dropped.
+    Amounts beyond ±MAX_YEN are clamped (see price_out_of_range).
+    Returns 0 if parsing fails.
+    """
+    # Fast path for the default value of every price input
+    if input_str == "0":
+        return 0
+    value = _to_decimal(input_str.translate(_YEN_CHARS))
+    if value is None or value.is_nan():
+        return 0
+    # Clamp rather than zero, so a stray extra digit is not priced as free
+    return int(max(min(value, Decimal(MAX_YEN)), Decimal(-MAX_YEN)))
+
+@functools.lru_cache(maxsize=512)
+def price_out_of_range(input_str):
+    """
+    True if input_str is a yen amount that parse_price had to clamp,
+    so app.py can warn instead of pricing a typo silently.
+    """
+    value = _to_decimal(input_str.translate(_YEN_CHARS))
+    return value is not None and not value.is_nan() and abs(value) > MAX_YEN
+
+@functools.lru_cache(maxsize=512)
+def parse_discount(input_str):
+    """
+    Parse a discount input (e.g., '10%' or '¥2000').
+    Returns (is_percent, value).
+      - is_percent = True if it's a '%' discount.
+      - value = hundredths of a percent as an int (e.g. 3540 for '35.4%'),
+        or the yen amount as an int, rounded up so that the discounted
+        price is floored (e.g. 501 for '¥500.9').
+    Percentages are clamped to [-_MAX_SURCHARGE_PERCENT, 100] and yen
+    amounts to ±MAX_YEN, infinities included. Unparseable or NaN input
+    counts as no discount (see discount_is_nan).
+    """
+    # Fast path for the "no discount" defaults
+    if not input_str or input_str in ("0", "0%", "¥0"):
+        return (False, 0)
+    inp = input_str.translate(_YEN_CHARS)
+    is_percent = inp.endswith("%")
+    # Parsed exactly: as a float, 100 - 35.4 is not 64.6 and the floored
+    # price would come out ¥1 low.
+    val = _to_decimal(inp[:-1] if is_percent else inp)
+    if val is None or val.is_nan():
+        return (False, 0)
+
+    if is_percent:
+        # Anything past 100% already prices at ¥0
+        val = max(min(val, Decimal(100)), Decimal(-_MAX_SURCHARGE_PERCENT))
+        return (True, int((val * 100).to_integral_value(ROUND_HALF_EVEN)))
+
+    # Assume currency discount
+    val = max(min(val, Decimal(MAX_YEN)), Decimal(-MAX_YEN))
+    return (False, int(val.to_integral_value(ROUND_CEILING)))
+
+@functools.lru_cache(maxsize=512)
+def discount_is_nan(input_str):
+    """
+    True if input_str is a NaN discount (e.g. 'nan' or 'nan%'). It has no
+    sensible clamp, so app.py rejects it instead of pricing it.
+    """
+    inp = input_str.translate(_YEN_CHARS)
+    val = _to_decimal(inp[:-1] if inp.endswith("%") else inp)
+    return val is not None and val.is_nan()
+
+@functools.lru_cache(maxsize=128)
+def _discount_fn(discount_str):
+    """
+    Specialize a discount string into a (factor, subtract) pair, so that
+    the discounted price is base_price * factor // _PERCENT_SCALE - subtract.
+    A percentage only scales; a yen amount only subtracts.
+    """
+    (is_percent, val) = parse_discount(discount_str)
+    if is_percent:
+        return (_PERCENT_SCALE - val, 0)
+    return (_PERCENT_SCALE, val)
+
+def _apply_discount(base_price, factor, subtract):
+    """
+    Numeric core of apply_discount, kept free of string handling.
+    Takes the (factor, subtract) pair from _discount_fn; all ints.
+    Returns final price in whole yen (>= 0).
+    """
+    discounted_price = base_price * factor // _PERCENT_SCALE - subtract
+
+    # Branchless clamp to zero: the comparison is 1 or 0.
+    return discounted_price * (discounted_price > 0)
+
+@functools.lru_cache(maxsize=512)
+def apply_discount(base_price, discount_str):
+    """
+    Applies discount to base_price based on discount_str.
+    If discount is percentage, base_price * (1 - discount%).
+    If discount is absolute yen, base_price - discount.
+    Returns final price (>= 0).
+    base_price is whole yen, so repeated (price, discount) pairs hit the cache.
+    """
+    (factor, subtract) = _discount_fn(discount_str)
+    return _apply_discount(base_price, factor, subtract)
+
+
+# One priced additional-charge line, shared by the totals and the summary.
+ExtraRow = namedtuple(
+    "ExtraRow",
+    "name cost_val discounted_cost qty line_total discount_str",
+)
+
+def price_extras(items):
+    """
+    Price all additional-charge items column-wise.
+    Takes item dicts with "name", "cost_str", "qty" and "discount_str".
+    Returns (rows, total): a list of ExtraRow and the summed line totals.
+    """
+    count = len(items)
+    discounts = [_discount_fn(item["discount_str"]) for item in items]
+    costs = np.fromiter((parse_price(item["cost_str"]) for item in items),
+                        dtype=np.int64, count=count)
+    factors = np.fromiter((d[0] for d in discounts),
+                          dtype=np.int64, count=count)
+    subtracts = np.fromiter((d[1] for d in discounts),
+                            dtype=np.int64, count=count)
+    qtys = np.fromiter((item["qty"] for item in items),
+                       dtype=np.int64, count=count)
+
+    # Same expression as _apply_discount, over whole columns
+    discounted = (costs * factors // _PERCENT_SCALE - subtracts).clip(min=0)
+    line_totals = discounted * qtys
+
+    rows = [
+        ExtraRow(item["name"], cost_val, discounted_cost, item["qty"],
+                 line_total, item["discount_str"])
+        for item, cost_val, discounted_cost, line_total in zip(
+            items, costs.tolist(), discounted.tolist(), line_totals.tolist())
+    ]
+    return rows, int(line_totals.sum())
@@ -0,0 +1,47 @@
+# ---------- CUSTOM CSS (Optional) ----------
+# Kept in its own module so the literal is built once per process rather
+# than on every Streamlit rerun of app.py.
+from typing import Final
+
+CUSTOM_CSS: Final[str] = """
+<style>
+body {
+    background: url("https://images.unsplash.com/photo-1586500051230-836e79a2b353?ixlib=rb-4.0.3&auto=format&fit=crop&w=2067&q=80");
+    background-size: cover;
+    background-position: center;
+    color: #fff;
+    font-family: 'Noto Sans JP', sans-serif;
+}
+
+[data-testid="stAppViewContainer"] {
+    background-color: rgba(0,0,0,0.4) !important;
+    padding: 2rem;
+    border-radius: 1rem;
+}
+
+h1, h2, h3, h4 {
+    font-family: 'Noto Serif JP', serif;
+    font-weight: 500;
+    color: #fffae6;
+    text-shadow: 1px 1px 2px #000;
+}
+
+label {
+    font-size: 1.1rem;
+    color: #fffae6;
+}
+
+.stButton button, .stFormSubmitButton button {
+    background-color: #6B2E5F !important;
+    border: none;
+    color: #ffffff;
+    padding: 0.6rem 1.2rem;
+    font-size: 1rem;
+    border-radius: 8px;
+    cursor: pointer;
+}
+.stButton button:hover, .stFormSubmitButton button:hover {
+    background-color: #8f437c !important;
+}
+</style>
+"""